@@ -17,15 +17,86 @@ Spike:
     The top and bottom static spikes.
 Bird:
     The bird or main player of the game.
+Text:
+    A line of text showing a value that is only re-rendered when the value changes.
+
+Functions
+----------
+preload_images(paths:list):
+    Starts decoding the given images in the background.
+load_image(path:str, size:tuple, colorkey:tuple, flip_x:bool, flip_y:bool):
+    Loads, converts, scales and flips an image once and caches the result.
 
 """
 import sys
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pygame
-from neuralnetwork import NeuralNetwork
+from neuralnetwork import NeuralNetwork, NeuralNetworkBatch
+
+# Images that have already been loaded, keyed by path, size, colorkey and flip
+_image_cache = {}
+
+# Images being decoded in the background, keyed by path
+_decoded_images = {}
+
+def preload_images(paths):
+    '''
+    Starts decoding the given images in the background, the display isn't needed for this.
+
+            Parameters:
+                    paths (list str): The paths to the image files
+    '''
+    executor = ThreadPoolExecutor()
+    for path in paths:
+        if path not in _decoded_images:
+            _decoded_images[path] = executor.submit(pygame.image.load, path)
+    executor.shutdown(wait=False)
+
+def load_image(path, size=None, colorkey=None, flip_x=False, flip_y=False):
+    '''
+    Loads, converts, scales and flips an image once and returns the cached result after that.
+
+            Parameters:
+                    path (str): The path to the image file
+                    size (tuple int): The size to scale the image to, None keeps its size
+                    colorkey (tuple int): The transparency color for images without alpha,
+                            baked into the alpha channel
+                    flip_x (bool): Whether or not to flip the image horizontally
+                    flip_y (bool): Whether or not to flip the image vertically
+            Returns:
+                    image (pygame image): The converted image ready for blitting
+    '''
+    key = (path, size, colorkey, flip_x, flip_y)
+    image = _image_cache.get(key)
+    if image is None:
+        # Use the image decoded in the background if it was preloaded
+        decoded = _decoded_images.get(path)
+        if decoded is None:
+            image = pygame.image.load(path)
+        else:
+            image = decoded.result()
+
+        # Bake the colorkey of images without alpha into an alpha channel so blits skip it
+        if colorkey is not None:
+            image = image.convert()
+            image.set_colorkey(colorkey)
+        image = image.convert_alpha()
+
+        # Resize the image
+        if size is not None:
+            image = pygame.transform.scale(image, size)
+
+        # Flip the image
+        if flip_x or flip_y:
+            image = pygame.transform.flip(image, flip_x, flip_y)
+
+        _image_cache[key] = image
+    return image
 
-class Bird(pygame.sprite.Sprite):
+class Bird(pygame.sprite.DirtySprite):
     """
     A class to represent the bird/main player.
 
@@ -35,14 +106,18 @@ class Bird(pygame.sprite.Sprite):
         image of the bird sprite
     rect : pygame rect
         rect information (x, y) for sprite
+    width : int
+        the width of the sprite image
+    height : int
+        the height of the sprite image
     bird_height : int
         contains the image height of the bird for resizing
     bird_width : int
         contains the image width of the bird for resizing
     x_speed : int
         the horizontal speed of the bird
-    velocity : int
-        the velocity of the bird to calculate force
+    frame : int
+        the number of frames since the last jump, indexing the trajectory
     isjump : int
         is the bird currently jumping; 1 = True, 0 = False
     alive : bool
@@ -57,6 +132,10 @@ class Bird(pygame.sprite.Sprite):
         the mass of the bird to calculate force
     VEL : int
         the default velocity of the bird
+    TRAJECTORY_FRAMES : int
+        the number of frames after a jump that the trajectory covers
+    TRAJECTORY : tuple int
+        how far the bird rises each frame after a jump, MASS * velocity
 
     Methods
     -------
@@ -66,10 +145,8 @@ class Bird(pygame.sprite.Sprite):
         Returns the height of the sprite image.
     get_width():
         Returns the width of the sprite image.
-    collide(pygame:sprite_group)
-        Returns whether or not bird has collided with sprite in sprite_group.
-    think(inputs:list)
-        Decides if the bird shall jump or not jump based on the given inputs.
+    collide(rects:list)
+        Returns whether or not bird has collided with any of the given rects.
     flip():
         Flips the birds direction.
     jump():
@@ -78,8 +155,6 @@ class Bird(pygame.sprite.Sprite):
         Sets the bird to be dead.
     reset(display_width:int, display_height:int):
         Resets the bird to restart game.
-    get_x_pos():
-        Returns the birds current x position.
     update():
         Updates the birds position.
     print_brain():
@@ -91,33 +166,32 @@ class Bird(pygame.sprite.Sprite):
     bird_height = 65
     bird_width = 100
 
-    # Bird mechanics
-    x_speed = 10
-    velocity = 8
-
     # Static bird mechanics
     VEL = 8
     MASS = 2
 
+    # Precomputed rise per frame, long enough that a bird hits the bottom spike before the end
+    TRAJECTORY_FRAMES = 128
+    TRAJECTORY = tuple(range(MASS * VEL, MASS * (VEL - TRAJECTORY_FRAMES), -MASS))
+
     def __init__(self, brain=NeuralNetwork(5, 8, 2)):
-        # Call the parent class (Sprite) constructor
+        # Call the parent class (DirtySprite) constructor
         super().__init__()
 
         # Load image sprite
-        self.image = pygame.image.load('images/bird.png').convert()
+        self.image = load_image('images/bird.png', (self.bird_width, self.bird_height))
 
-        # Resize the image
-        self.image = pygame.transform.scale(self.image, (self.bird_width, self.bird_height))
-
-        # Set transparency color
-        self.image.set_colorkey(Game.BLACK)
-
-        # Set rect of the image
+        # Set rect of the image and cache its size, which doesn't change when flipped
         self.rect = self.image.get_rect()
+        self.width, self.height = self.rect.size
 
         # Position bird in the center of the screen
-        self.rect.x = int((Game.display_width - self.get_width()) / 2)
-        self.rect.y = int((Game.display_height / 2) - self.get_height())
+        self.rect.topleft = ((Game.display_width - self.get_width()) // 2,
+            (Game.display_height // 2) - self.get_height())
+
+        # Bird mechanics
+        self.x_speed = 10
+        self.frame = 0
 
         # Bird is not currently jumping
         self.isjump = 0
@@ -157,7 +231,7 @@ class Bird(pygame.sprite.Sprite):
                 Returns:
                         a (int): The height of the sprite's image
         '''
-        return self.image.get_height()
+        return self.height
 
     def get_width(self):
         '''
@@ -166,39 +240,29 @@ class Bird(pygame.sprite.Sprite):
                 Returns:
                         a (int): The width of the sprite's image
         '''
-        return self.image.get_width()
+        return self.width
 
     def flip(self):
         '''
         Flips the birds direction.
         '''
-        self.image = pygame.transform.flip(self.image, True, False)
-        if self.x_speed > 0:
-            self.x_speed = -10
-        else:
-            self.x_speed = 10
+        self.x_speed = -self.x_speed
 
-    def collide(self, sprite_group):
+        # Swap to the cached image facing the new direction
+        self.image = load_image('images/bird.png', (self.bird_width, self.bird_height),
+            flip_x=self.x_speed < 0)
+        self.dirty = 1
+
+    def collide(self, rects):
         '''
-        Checks if the bird has collided with another sprite in sprite group.
+        Checks if the bird has collided with any of the given rects.
 
                 Parameters:
-                        sprite_group (pygame:sprit_group): The group to check against the object
+                        rects (list pygame rect): The rects to check against the object
                 Returns:
                         a (bool): Whether or not the bird collided
         '''
-        return pygame.sprite.spritecollide(self, sprite_group, False)
-
-    def think(self, inputs):
-        '''
-        Makes the decision to jump or not to jump based on the given inputs.
-
-                Parameters:
-                        inputs (list:int): The inputs for the neural network
-        '''
-        action = self.brain.predict(inputs)
-        if action[0] > action[1]:
-            self.jump()
+        return self.rect.collidelist(rects) != -1
 
     def jump(self):
         '''
@@ -224,55 +288,47 @@ class Bird(pygame.sprite.Sprite):
         self.alive = True
 
         # Position bird in the center of the screen
-        self.rect.x = (display_width - self.get_width()) / 2
-        self.rect.y = (display_height / 2) - self.get_height()
+        self.rect.topleft = ((display_width - self.get_width()) // 2,
+            (display_height // 2) - self.get_height())
 
         # Reset direction
         if self.x_speed < 0:
             self.flip()
 
-        # Reset the velocity and jump
+        # Reset the trajectory and jump
         self.isjump = 0
-        self.velocity = self.VEL
+        self.frame = 0
 
         # Reset score and fitness
         self.score = 0
 
-    def get_x_pos(self):
-        '''
-        Returns the x position of this bird.
-
-                Returns:
-                        rect.x (int): The x position of this bird
-        '''
-        if self.x_speed > 0:
-            return self.rect.x + self.get_width()
-        return self.rect.x
+        # Redraw the bird at its new position
+        self.dirty = 1
 
     def update(self):
         '''
         Updates the position of the bird.
         '''
         if self.alive:
-            # Update horizontal movement
-            self.rect.x += self.x_speed
-
             # Increase the score
             self.score += 1
 
-            # Update gravity and falling based on force
-            force = self.MASS * self.velocity
-            self.rect.y = self.rect.y - force
-            self.velocity -= 1
+            # Update horizontal movement and falling along the precomputed trajectory
+            self.rect.move_ip(self.x_speed, -self.TRAJECTORY[self.frame])
 
             # Reset upon jumping
             if self.isjump:
-                self.velocity = self.VEL
+                self.frame = 0
                 self.isjump = 0
+            elif self.frame < self.TRAJECTORY_FRAMES - 1:
+                self.frame += 1
+
+            # Redraw the bird at its new position
+            self.dirty = 1
 
-class Spike(pygame.sprite.Sprite):
+class Spike:
     """
-    A class to represent the static bottom and top spikes as sprites.
+    A class to represent the static bottom and top spikes drawn onto the background.
 
     Attributes
     ----------
@@ -280,6 +336,10 @@ class Spike(pygame.sprite.Sprite):
         image of the sprite
     rect : pygame rect
         rect information (x, y) for sprite
+    height : int
+        the height of the sprite image
+    flipped : bool
+        whether or not the sprite image is flipped
 
     Methods
     -------
@@ -288,18 +348,16 @@ class Spike(pygame.sprite.Sprite):
     flip():
         Flips the sprite image horizontally.
     """
-    def __init__(self):
-        # Call the parent class (Sprite) constructor
-        super().__init__()
+    __slots__ = ('image', 'rect', 'height', 'flipped')
 
+    def __init__(self):
         # Load image sprite
-        self.image = pygame.image.load('images/spikes.png').convert()
-
-        # Set transparency color
-        self.image.set_colorkey(Game.WHITE)
+        self.flipped = False
+        self.image = load_image('images/spikes.png')
 
-        # Set rect of the image
+        # Set rect of the image and cache its size, which doesn't change when flipped
         self.rect = self.image.get_rect()
+        self.height = self.rect.height
 
     def get_height(self):
         '''
@@ -308,15 +366,16 @@ class Spike(pygame.sprite.Sprite):
                 Returns:
                         a (int): The height of the sprite's image
         '''
-        return self.image.get_height()
+        return self.height
 
     def flip(self):
         '''
         Flips the sprite image horizontally.
         '''
-        self.image = pygame.transform.flip(self.image, False, True)
+        self.flipped = not self.flipped
+        self.image = load_image('images/spikes.png', flip_y=self.flipped)
 
-class WallSpike(pygame.sprite.Sprite):
+class WallSpike(pygame.sprite.DirtySprite):
     """
     A class to represent the spikes on the side walls.
 
@@ -326,6 +385,12 @@ class WallSpike(pygame.sprite.Sprite):
         image of the sprite
     rect : pygame rect
         rect information (x, y) for sprite
+    width : int
+        the width of the sprite image
+    height : int
+        the height of the sprite image
+    flipped : bool
+        whether or not the sprite image is flipped
 
     Methods
     -------
@@ -340,22 +405,20 @@ class WallSpike(pygame.sprite.Sprite):
     reset():
         Resets the spike back to its default state.
     """
-
     def __init__(self):
-        # Call the parent class (Sprite) constructor
+        # Call the parent class (DirtySprite) constructor
         super().__init__()
 
         # Load image sprite
-        self.image = pygame.image.load('images/wall_spike.png').convert()
-
-        # Set transparency color
-        self.image.set_colorkey(Game.WHITE)
+        self.flipped = False
+        self.image = load_image('images/wall_spike.png', colorkey=Game.WHITE)
 
         # Start with image flipped for left side
         self.flip()
 
-        # Set rect of the image
+        # Set rect of the image and cache its size, which doesn't change when flipped
         self.rect = self.image.get_rect()
+        self.width, self.height = self.rect.size
 
     def get_width(self):
         '''
@@ -364,7 +427,7 @@ class WallSpike(pygame.sprite.Sprite):
                 Returns:
                         a (int): The width of the sprite's image
         '''
-        return self.image.get_width()
+        return self.width
 
     def get_height(self):
         '''
@@ -373,13 +436,16 @@ class WallSpike(pygame.sprite.Sprite):
                 Returns:
                         a (int): The height of the sprite's image
         '''
-        return self.image.get_height()
+        return self.height
 
     def flip(self):
         '''
         Flips the sprite image vertically.
         '''
-        self.image = pygame.transform.flip(self.image, True, False)
+        self.flipped = not self.flipped
+        self.image = load_image('images/wall_spike.png', colorkey=Game.WHITE,
+            flip_x=self.flipped)
+        self.dirty = 1
 
     def set_spike(self, x_pos, y_pos):
         '''
@@ -389,18 +455,22 @@ class WallSpike(pygame.sprite.Sprite):
                         x_pos (int): The x position for the sprite to be set at
                         y_pos (int): The y position for the sprite to be set at
         '''
-        self.rect.x = x_pos
-        self.rect.y = y_pos
+        self.rect.topleft = (x_pos, y_pos)
+        self.dirty = 1
 
     def reset(self):
         '''
         Resets the spikes to reset the game.
         '''
-        self.__init__()
+        # Face the left side again and move back to the corner, keeping the same rect
+        self.flipped = True
+        self.image = load_image('images/wall_spike.png', colorkey=Game.WHITE, flip_x=True)
+        self.rect.topleft = (0, 0)
+        self.dirty = 1
 
-class Wall(pygame.sprite.Sprite):
+class Wall:
     """
-    A class to represent the walls confining the player as sprites.
+    A class to represent the walls confining the player drawn onto the background.
 
     Attributes
     ----------
@@ -408,6 +478,8 @@ class Wall(pygame.sprite.Sprite):
         image of the sprite
     rect : pygame rect
         rect information (x, y) for sprite
+    width : int
+        the width of the sprite image
     wall_height : int
         default height of the wall
     wall_width : int
@@ -418,22 +490,19 @@ class Wall(pygame.sprite.Sprite):
     get_width():
         Returns the width of the sprite image.
     """
+    __slots__ = ('image', 'rect', 'width')
+
     # Default wall height and width
     wall_height = 1920
     wall_width = 33
 
     def __init__(self):
-        # Call the parent class (Sprite) constructor
-        super().__init__()
-
         # Load image sprite
-        self.image = pygame.image.load('images/wall.png').convert()
+        self.image = load_image('images/wall.png', colorkey=Game.WHITE)
 
-        # Set transparency color
-        self.image.set_colorkey(Game.WHITE)
-
-        # Set rect of the image
+        # Set rect of the image and cache its size
         self.rect = self.image.get_rect()
+        self.width = self.rect.width
 
     def get_width(self):
         '''
@@ -442,7 +511,61 @@ class Wall(pygame.sprite.Sprite):
                 Returns:
                         a (int): The width of the sprite's image
         '''
-        return self.image.get_width()
+        return self.width
+
+class Text(pygame.sprite.DirtySprite):
+    """
+    A class to represent a line of text as a sprite.
+
+    Attributes
+    ----------
+    image : pygame image
+        image of the rendered text
+    rect : pygame rect
+        rect information (x, y) for sprite
+    font : pygame font
+        font used to render the text
+    color : Tuple int
+        contains the RGB color of the text
+    prefix : str
+        the text displayed before the value
+    value : int
+        the value currently rendered in the image
+
+    Methods
+    -------
+    set_value(value:int):
+        Re-renders the image if the given value differs from the current value.
+    """
+    def __init__(self, font, color, x_pos, y_pos, prefix=""):
+        # Call the parent class (DirtySprite) constructor
+        super().__init__()
+
+        # Set font, color and prefix
+        self.font = font
+        self.color = color
+        self.prefix = prefix
+
+        # Render the prefix alone at the given position until a value is set
+        self.value = None
+        self.image = self.font.render(self.prefix, True, self.color).convert_alpha()
+        self.rect = self.image.get_rect()
+        self.rect.x = x_pos
+        self.rect.y = y_pos
+
+    def set_value(self, value):
+        '''
+        Re-renders the image only if the given value differs from the current value.
+
+                Parameters:
+                        value (int): The value to display after the prefix
+        '''
+        if value != self.value:
+            self.value = value
+            text = self.prefix + str(value)
+            self.image = self.font.render(text, True, self.color).convert_alpha()
+            self.rect.size = self.image.get_size()
+            self.dirty = 1
 
 class Game:
     """
@@ -454,6 +577,14 @@ class Game:
         the screen for the game
     font : pygame
         font used for text in the window
+    background : pygame image
+        the background color, walls and static spikes the sprites are cleared with
+    score_text : Text
+        the text displaying the current score
+    generation_text : Text
+        the text displaying the current generation
+    high_score_text : Text
+        the text displaying the session high score
     score : int
         holds the score for the current game
     display_width : int
@@ -470,22 +601,34 @@ class Game:
         the left side wall for the bird to bounce off of
     right_side_wall : Wall
         the right side wall for the bird to bounce off of
-    walls : Pygame sprite group
-        a list of wall sprites for collision detection
-    spikes : Pygame sprite group
-        a list of spike sprites for collision detection
     top_wall_spike : Wall_Spike
         the top side of the wall spikes.
     bottom_wall_spike : Wall_Spike
         the bottom side of the wall spikes.
     population: list Bird
         list of birds in the population
+    alive_birds: list Bird
+        list of the birds in the population still alive
+    alive_count: int
+        the number of birds in the population still alive
+    right_count: int
+        the number of alive birds in the population going right
+    brains: NeuralNetworkBatch
+        the brains of the population stacked to predict all of their actions at once
+    fitness: numpy.array
+        the normalized fitness of every bird in the population
+    fitness_cdf: numpy.array
+        the cumulative normalized fitness of the population for selection
     generation: int
         the number of generations
     high_score: int
         the high score for the session
     POPULATION_SIZE: int
         the total size of the population
+    ACTION_EVERY: int
+        the number of timesteps between the birds deciding whether to jump
+    steps: int
+        the number of timesteps the current generation has been running for
     WHITE : Tuple int
         contains the RGB color for white
     BLACK : Tuple int
@@ -494,11 +637,30 @@ class Game:
         contains the RGB color for the background
     FPS : int
         sets the framerate for pygame to limit framerate
+    MAX_STEPS : int
+        the most timesteps the game advances before drawing a frame
+    VSYNC : bool
+        whether or not to request vsync from the display driver
+    VSYNC_FPS_CAP : int
+        the loose framerate limit kept in case vsync doesn't actually block
+    vsync : bool
+        whether or not vsync was negotiated for the screen
+    headless : bool
+        whether or not to train without showing or drawing the game, set by AFLI_HEADLESS
+    render_every : int
+        train uncapped and only draw every this many timesteps when above 1, set by
+        AFLI_RENDER_EVERY
 
     Methods
     -------
     play():
         Starts the game, contains the main game loop.
+    train():
+        Trains the population as fast as possible, drawing only every few timesteps.
+    handle_events():
+        Handles quitting, saving and loading brains, and repainting the window.
+    step():
+        Advances the game by one fixed timestep.
     draw():
         Draws the main components for the game.
     update():
@@ -507,6 +669,8 @@ class Game:
         Creates the side walls.
     create_spikes():
         Creates the top and bottom spikes.
+    create_background():
+        Creates the background with the static walls and spikes baked into it.
     add_bird():
         Adds the bird to the spite group and to the center of the screen.
     collision_detection():
@@ -522,29 +686,23 @@ class Game:
     generate_new_population():
         Generates a new population based off of the pool selection
     pool_selection():
-        Returns a clone of a bird based on their fitness for the next generation.
+        Returns a mutated clone of a brain based on fitness for the next generation.
+    select_indexes(count:int):
+        Returns the indexes of birds selected based on their fitness.
     normalize_fitness():
         Normalizes the score of every bird into a fitness score for pool selection.
-    first_alive_bird():
-        Returns the first bird that is still alive in the population.
+    stack_brains():
+        Stacks the brains of the population for predicting their actions at once.
+    set_brains(brains:NeuralNetworkBatch):
+        Gives every bird in the population its brain from the batch.
     calculate_action():
         Determine what each bird in the population should do.
-    distance_to_wall(bird:Bird):
-        Calculate the distance from the given bird to the wall.
-    distance_to_top_spike(bird:Bird):
-        Calculate the distance from the given bird to the top spike.
-    distance_to_bottom_spike(bird:Bird):
-        Calculate the distance from the given bird to the bottom spike.
-    distance_to_top_wall_spike(bird:Bird):
-        Calculate the distance from the given bird to the top wall spike.
-    distance_to_bottom_wall_spike(bird:Bird):
-        Calculate the distance from the given bird to the bottom wall spike.
+    calculate_inputs():
+        Calculate the distances used as inputs for every bird at once.
     birds_going_same_direction():
         Checks if all alive birds in the population are going the same direction.
     update_high_score():
         Updates the high score if it needs to be updated.
-    best_bird():
-        Returns the bird with the a high fitness score in the population.
     """
     # Start the window in the center of the screen
     os.environ['SDL_VIDEO_CENTERED'] = '1'
@@ -557,38 +715,85 @@ class Game:
     # Population Size
     POPULATION_SIZE = 200
 
+    # Timesteps between the birds deciding whether to jump, they barely move in between
+    ACTION_EVERY = 2
+
     # Screen Information
     display_width = 1080
     display_height = 900
     FPS = 60
+    MAX_STEPS = 5
+    VSYNC = True
+    VSYNC_FPS_CAP = 120
 
     # Font style
     font_size = 36
 
-    # Sprite Groups
-    all_sprites_list = pygame.sprite.Group()
-    walls = pygame.sprite.Group()
-    spikes = pygame.sprite.Group()
-
     def __init__(self):
+        # Read the training speed, uncapped when headless or when frames are skipped
+        self.headless = os.environ.get('AFLI_HEADLESS', '') not in ('', '0')
+        render_every = os.environ.get('AFLI_RENDER_EVERY', '1')
+        if not render_every.isdigit() or int(render_every) < 1:
+            raise ValueError("AFLI_RENDER_EVERY must be a whole number of at least 1, got "
+                f"{render_every!r}")
+        self.render_every = int(render_every)
+
         # Init pygame
         pygame.init()
 
+        # Decode the images while the window is being created
+        preload_images(['images/bird.png', 'images/spikes.png', 'images/wall_spike.png',
+            'images/wall.png'])
+
+        # Only queue the events the game loop handles
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, pygame.VIDEOEXPOSE])
+
         # Set window title
         pygame.display.set_caption('Afli')
 
+        # Create the sprite group, owned by this game so separate games don't share sprites
+        self.all_sprites_list = pygame.sprite.LayeredDirty()
+
         # Create population
         self.population = []
 
-        # Create window and clock
-        self.screen = pygame.display.set_mode([self.display_width, self.display_height])
+        # Create window with vsync, falling back to a plain window if it can't be negotiated
+        self.vsync = self.VSYNC and not self.headless
+        if self.headless:
+            # Images still need a display to be converted for, it is just never shown
+            self.screen = pygame.display.set_mode([self.display_width, self.display_height],
+                pygame.HIDDEN)
+        else:
+            try:
+                self.screen = pygame.display.set_mode(
+                    [self.display_width, self.display_height],
+                    pygame.SCALED | pygame.DOUBLEBUF, vsync=int(self.VSYNC))
+            except pygame.error:
+                self.vsync = False
+                self.screen = pygame.display.set_mode(
+                    [self.display_width, self.display_height])
+
+        # Create clock, capping the framerate or just a safety limit when vsync paces frames
         self.clock = pygame.time.Clock()
 
         # Set font
         self.font = pygame.font.SysFont("courier", self.font_size)
 
+        # Create the text below every other sprite
+        self.score_text = Text(self.font, Game.WHITE, self.display_width // 2,
+            self.display_height // 4)
+        self.generation_text = Text(self.font, Game.BLACK, self.display_width // 15,
+            self.display_height // 15, "Generation: ")
+        self.high_score_text = Text(self.font, Game.BLACK, self.display_width // 15,
+            (self.display_height // 15) + 30, "Session High Score: ")
+        self.all_sprites_list.add(self.score_text, self.generation_text, self.high_score_text)
+
         # Populate the population
         self.add_bird()
+        self.alive_birds = list(self.population)
+        self.alive_count = len(self.population)
+        self.right_count = len(self.population)
 
         # Save and load components
         self.save = False
@@ -596,10 +801,26 @@ class Game:
         # Create game components
         self.score = 0
         self.high_score = 0
+        self.steps = 0
+
+        # Stack the brains, every bird has an equal chance until the first generation ends
+        self.brains = None
+        self.stack_brains()
+        self.fitness = np.full(len(self.population), 1 / len(self.population))
+        self.fitness_cdf = np.cumsum(self.fitness)
+
         self.create_spikes()
         self.create_walls()
+        self.create_background()
         self.generation = 0
 
+        # Cache the bounds of the walls and the rects of every spike for collision detection
+        self._wall_left_x = self.left_side_wall.rect.right
+        self._wall_right_x = self.right_side_wall.rect.left
+        self._spike_rects = [self.top_spike.rect, self.bottom_spike.rect,
+            self.top_left_wall_spike.rect, self.bottom_left_wall_spike.rect,
+            self.top_right_wall_spike.rect, self.bottom_right_wall_spike.rect]
+
     def add_bird(self):
         '''
         Creates the bird/main player as an attribute of the Game class.
@@ -629,14 +850,6 @@ class Game:
         self.left_side_wall.rect.x = 0
         self.left_side_wall.rect.y = 0
 
-        # Add walls to the all sprites group
-        self.all_sprites_list.add(self.right_side_wall)
-        self.all_sprites_list.add(self.left_side_wall)
-
-        # Add walls to the walls sprite group
-        self.walls.add(self.right_side_wall)
-        self.walls.add(self.left_side_wall)
-
     def create_spikes(self):
         '''
         Creates top, bottom and side spikes.
@@ -656,6 +869,14 @@ class Game:
         self.top_right_wall_spike.flip()
         self.bottom_right_wall_spike.flip()
 
+        # Cache the values spike_change needs that only depend on the sprite sizes
+        self._gap_start = self.display_height / 2
+        self._gap_min = self.population[0].height * 2.5
+        self._a_range_constraint = int(self.top_spike.height * 2)
+        self._spike_width = self.top_left_wall_spike.width
+        self._spike_top = 0 - self.top_left_wall_spike.height
+        self._spike_right_x = self.display_width - self._spike_width
+
         self.spike_change()
 
         # Position bottom spike
@@ -669,44 +890,119 @@ class Game:
         # Flip top spikes
         self.top_spike.flip()
 
-        # Add spikes to the all sprite group
-        self.all_sprites_list.add(self.top_spike)
-        self.all_sprites_list.add(self.bottom_spike)
+        # Add the moving wall spikes to the all sprite group
         self.all_sprites_list.add(self.top_left_wall_spike)
         self.all_sprites_list.add(self.top_right_wall_spike)
         self.all_sprites_list.add(self.bottom_left_wall_spike)
         self.all_sprites_list.add(self.bottom_right_wall_spike)
 
-        # Add to the spikes group
-        self.spikes.add(self.top_spike)
-        self.spikes.add(self.bottom_spike)
-        self.spikes.add(self.top_left_wall_spike)
-        self.spikes.add(self.top_right_wall_spike)
-        self.spikes.add(self.bottom_left_wall_spike)
-        self.spikes.add(self.bottom_right_wall_spike)
+    def create_background(self):
+        '''
+        Creates the background with the static walls and spikes baked into it.
+        '''
+        # Fill the background with the background color
+        self.background = pygame.Surface(self.screen.get_size()).convert()
+        self.background.fill(Game.BACKGROUND)
+
+        # Draw the walls and the top and bottom spikes once
+        for sprite in (self.left_side_wall, self.right_side_wall, self.top_spike,
+                self.bottom_spike):
+            self.background.blit(sprite.image, sprite.rect)
+
+        # Clear the sprites with the background between frames
+        self.all_sprites_list.clear(self.screen, self.background)
 
     def play(self):
         '''
         Starts the game, contains the main game loop.
         '''
+        # Training runs in its own loop as fast as possible
+        if self.headless or self.render_every > 1:
+            self.train()
+            return
+
+        # Bind the names used every frame as locals
+        handle_events = self.handle_events
+        step = self.step
+        draw = self.draw
+        max_steps = self.MAX_STEPS
+        elapsed_ms = 0
+
+        if self.vsync:
+            # The display paces the frames, the clock only sleeps if vsync doesn't block
+            tick = self.clock.tick
+            frame_cap = self.VSYNC_FPS_CAP
+            step_ms = 1000 / self.FPS
+        else:
+            # Step by the whole milliseconds the clock paces frames to, busy looping keeps
+            # them exact so every frame advances exactly one step instead of sometimes none
+            tick = self.clock.tick_busy_loop
+            frame_cap = self.FPS
+            step_ms = 1000 // self.FPS
+
         while True:
-            self.clock.tick(self.FPS)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_s:
-                        self.save = True
-                    if event.key == pygame.K_l:
-                        self.population[0].load_brain()
-                        self.reset()
-                        print("Loaded brain")
-            self.collision_detection()
-            if self.all_birds_dead():
-                self.next_generation()
-            self.update()
-            self.draw()
+            elapsed_ms += tick(frame_cap)
+            handle_events()
+
+            # Advance the game in fixed steps so a slow frame doesn't slow the game down
+            steps = 0
+            while elapsed_ms >= step_ms:
+                step()
+                elapsed_ms -= step_ms
+                steps += 1
+
+                # Drop the time that can't be caught up on instead of falling further behind
+                if steps == max_steps:
+                    elapsed_ms = 0
+            draw()
+
+    def train(self):
+        '''
+        Trains the population as fast as possible, only drawing every render_every timesteps
+        and never when headless.
+        '''
+        # Bind the names used every frame as locals
+        handle_events = self.handle_events
+        step = self.step
+        draw = self.draw
+        headless = self.headless
+        steps = range(self.render_every)
+
+        while True:
+            handle_events()
+            for _ in steps:
+                step()
+            if not headless:
+                draw()
+
+    def handle_events(self):
+        '''
+        Handles quitting, the save and load keys, and repainting the uncovered window.
+        '''
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_s:
+                    self.save = True
+                elif event.key == pygame.K_l:
+                    self.population[0].load_brain()
+                    self.stack_brains()
+                    self.reset()
+                    print("Loaded brain")
+            elif event.type == pygame.VIDEOEXPOSE:
+                # Only dirty rects are updated, so redraw everything once uncovered
+                self.all_sprites_list.repaint_rect(self.screen.get_rect())
+
+    def step(self):
+        '''
+        Advances the game by one fixed timestep.
+        '''
+        self.collision_detection()
+        if self.all_birds_dead():
+            self.next_generation()
+        self.update()
 
     def reset(self):
         '''
@@ -714,6 +1010,10 @@ class Game:
         '''
         for bird in self.population:
             bird.reset(self.display_width, self.display_height)
+        self.alive_birds = list(self.population)
+        self.alive_count = len(self.population)
+        self.right_count = len(self.population)
+        self.steps = 0
         self.score = 0
         self.spike_change()
 
@@ -721,35 +1021,32 @@ class Game:
         '''
         Randomize wall spikes and the opening for the player to go through.
         '''
-        # Set the minimum size of the gap to be twice the size of the bird
-        gap_min = self.population[0].get_height() * 2.5
-
-        # Set the gap to decrease when score increases
-        gap = (self.display_height / 2) - (self.score * 10)
-
-        # Check that gap isn't below minimum
-        if gap < gap_min:
-            gap = gap_min
+        # Set the gap to decrease when score increases, but never below the minimum size of
+        # the gap of two and a half birds
+        gap = self._gap_start - (self.score * 10)
+        if gap < self._gap_min:
+            gap = self._gap_min
 
         # Set the constraints for the random y coordinate
-        a_range_constraint = int(self.top_spike.get_height() * 2)
+        a_range_constraint = self._a_range_constraint
         b_range_constraint = int((self.display_height - gap) - a_range_constraint)
 
-        # Randomize the y coordinate given the constraints
-        random_y = random.randint(a_range_constraint, b_range_constraint)
+        # Randomize the y coordinate given the constraints, including the upper one
+        random_y = random.randrange(a_range_constraint, b_range_constraint + 1)
 
         # Get the new y coordinates for both the top and bottom wall spikes
-        top_y = (0 - self.top_left_wall_spike.get_height()) + random_y
+        top_y = self._spike_top + random_y
         bottom_y = random_y + gap
 
         # Get the x coordinate for spikes on right side
-        x_pos = self.display_width - self.top_left_wall_spike.get_width()
+        x_pos = self._spike_right_x
 
         # Width of the spikes to hide the spikes after bounces
-        spike_width = self.top_left_wall_spike.get_width()
+        spike_width = self._spike_width
 
+        # Every alive bird is going the same way here, so any going right means all are
         if not self.all_birds_dead():
-            if self.first_alive_bird().x_speed > 0:
+            if self.right_count > 0:
                 # Set position of spikes birds are going towards
                 self.top_right_wall_spike.set_spike(x_pos, top_y)
                 self.bottom_right_wall_spike.set_spike(x_pos, bottom_y)
@@ -771,30 +1068,7 @@ class Game:
                 Returns:
                         a (bool): Whether or not the bird is dead
         '''
-        for bird in self.population:
-            if bird.alive:
-                return False
-        return True
-
-    def best_bird(self):
-        '''
-        Finds a decent bird and returns them.
-
-                Returns:
-                        best_bird (Bird): Bird with a decent fitness score
-        '''
-        # Pick a random number between 0 and 1
-        random_num = random.random()
-        index = 0
-        # Continue to subtract from that number based on the normalized fitness of birds
-        while random_num > 0:
-            random_num -= self.population[index].fitness
-            index += 1
-        index -= 1
-
-        # When the bird has a fitness that exceeds the random number return a clone
-        new_brain = self.population[index].brain.copy()
-        return Bird(new_brain)
+        return self.alive_count == 0
 
     def next_generation(self):
         '''
@@ -802,164 +1076,144 @@ class Game:
         '''
         self.normalize_fitness()
         if self.save:
-            self.pool_selection().print_brain()
+            self.pool_selection().save()
             self.save = False
             print("Saved brain")
         self.reset()
         self.generate_new_population()
         self.generation += 1
 
+        # Nothing is drawn when headless, so report the progress instead
+        if self.headless:
+            print(f"Generation: {self.generation} Session High Score: {self.high_score}")
+
     def generate_new_population(self):
         '''
         Generates a new population based off of the best bird according to the pool selection.
         '''
-        # Create a new population
-        new_pop = []
-        # For every bird in the previous population select ones for new pop
-        for bird in self.population:
-            new_bird = self.pool_selection()
-            new_pop.append(new_bird)
+        # Select the new brains before any bird is changed so selection uses the old fitness
+        indexes = self.select_indexes(len(self.population))
 
-        # Copy the best bird from the previous group to ensure progress doesn't regress
-        new_pop[0] = self.best_bird()
+        # Make the first brain a copy of the fittest bird from the previous group to ensure
+        # progress doesn't regress
+        indexes[0] = int(np.argmax(self.fitness))
+        new_brains = self.brains.select(indexes)
 
-        # Remove all of the previous birds from their groups
-        for bird in self.population:
-            bird.remove_from_groups()
+        # Mutate every brain at once except the copy of the fittest bird
+        new_brains.mutate(slice(1, None))
 
-        # Add the new population of birds to their respective groups
-        for bird in new_pop:
-            self.all_sprites_list.add(bird)
-
-        self.population = new_pop
+        # Reuse the existing birds and sprites, only giving them their new brains
+        self.set_brains(new_brains)
 
     def pool_selection(self):
         '''
         Selects birds based off of fitness.
 
                 Returns:
-                        bird (Bird): Bird with a new brain
-        '''
-        # Pick a random number between 0 and 1
-        random_num = random.random()
-        index = 0
-        # Continue to subtract from that number based on the normalized fitness of birds
-        while random_num > 0:
-            random_num -= self.population[index].fitness
-            index += 1
-        index -= 1
-
-        # When the bird has a fitness that exceeds the random number return a clone
-        new_brain = self.population[index].brain.copy()
-        new_brain.mutate()
-        return Bird(new_brain)
-
-    def normalize_fitness(self):
-        '''
-        Normalizes the fitness data for pool selection.
+                        new_brain (NeuralNetwork): Mutated copy of the selected bird's brain
         '''
-        # Expand the birds score to increase standard deviation
-        for bird in self.population:
-            bird.score = pow(bird.score, 2)
-        total_sum = 0
+        index = self.select_indexes(1)[0]
 
-        # Take the total sum of the birds scores and normalize the data as fitness
-        for bird in self.population:
-            total_sum += bird.score
-        for bird in self.population:
-            bird.fitness = bird.score / total_sum
+        # Return a mutated clone of the selected bird's brain
+        new_brain = self.population[index].brain.copy()
+        new_brain.mutate()
+        return new_brain
 
-    def first_alive_bird(self):
+    def select_indexes(self, count):
         '''
-        Retrieves the first bird that is alive.
+        Selects the indexes of birds based off of fitness.
 
+                Parameters:
+                        count (int): The number of birds to select
                 Returns:
-                        bird (Bird): Bird that is alive still in the population
+                        indexes (list int): The indexes of the selected birds
         '''
-        for bird in self.population:
-            if bird.alive:
-                return bird
-        return self.population[0]
+        # Find where random numbers between 0 and 1 land in the cumulative fitness
+        indexes = np.searchsorted(self.fitness_cdf, np.random.random(count))
 
-    def calculate_action(self):
+        # Rounding can leave the total a little under 1, so keep the last bird in range
+        return np.minimum(indexes, len(self.population) - 1).tolist()
+
+    def normalize_fitness(self):
         '''
-        Determine what each bird in the population should do.
+        Normalizes the fitness data for pool selection.
         '''
-        for bird in self.population:
-            inputs = []
-            inputs.append(self.distance_to_wall(bird))
-            inputs.append(self.distance_to_top_spike(bird))
-            inputs.append(self.distance_to_bottom_spike(bird))
-            inputs.append(self.distance_to_top_wall_spike(bird))
-            inputs.append(self.distance_to_bottom_wall_spike(bird))
-            bird.think(inputs)
+        # Expand the birds score to increase standard deviation
+        scores = np.array([bird.score for bird in self.population], dtype=float)
+        scores *= scores
 
-    def distance_to_wall(self, bird):
-        '''
-        Returns the distance from the given bird to the wall.
+        # Take the total sum of the birds scores and normalize the data as fitness
+        self.fitness = scores / scores.sum()
+        for bird, bird_fitness in zip(self.population, self.fitness.tolist()):
+            bird.fitness = bird_fitness
 
-                Parameters:
-                        bird (Bird): Bird to calculate how far from wall
-                Returns:
-                        x (int): The distance from the wall the bird is
-        '''
-        if bird.x_speed > 0:
-            return self.right_side_wall.rect.x - bird.get_x_pos()
-        distance = self.left_side_wall.rect.x + self.left_side_wall.get_width()
-        return bird.get_x_pos() - distance
+        # Keep the cumulative fitness for selection
+        self.fitness_cdf = np.cumsum(self.fitness)
 
-    def distance_to_top_spike(self, bird):
+    def stack_brains(self):
         '''
-        Returns the distance from the given bird to the top spike.
-
-                Parameters:
-                        bird (Bird): Bird to calculate how far from top spike
-                Returns:
-                        x (int): The distance from the top spike the bird is
+        Stacks the brains of the population for predicting their actions at once.
         '''
-        return bird.rect.y - self.top_spike.get_height()
+        self.set_brains(NeuralNetworkBatch([bird.brain for bird in self.population]))
 
-    def distance_to_bottom_spike(self, bird):
+    def set_brains(self, brains):
         '''
-        Returns the distance from the given bird to the bottom spike.
+        Gives every bird in the population its brain from the batch, so all of the weights
+        live in the batch's arrays and each bird's brain only refers to a row of them.
 
                 Parameters:
-                        bird (Bird): Bird to calculate how far from bottom spike
-                Returns:
-                        x (int): The distance from the bottom spike the bird is
+                        brains (NeuralNetworkBatch): One brain for every bird in the population
         '''
-        bird_y = bird.rect.y + bird.get_height()
-        return self.bottom_spike.rect.y - bird_y
+        self.brains = brains
+        for bird, brain in zip(self.population, brains.networks()):
+            bird.brain = brain
 
-    def distance_to_top_wall_spike(self, bird):
+    def calculate_action(self):
         '''
-        Returns the distance from the given bird to the top wall spike.
-
-                Parameters:
-                        bird (Bird): Bird to calculate how far from top wall spike
-                Returns:
-                        x (int): The distance from the top wall spike the bird is
+        Determine what each bird in the population should do.
         '''
-        if bird.x_speed > 0:
-            y_of_spike = self.top_right_wall_spike.rect.y + self.top_right_wall_spike.get_height()
-            return bird.rect.y - y_of_spike
-        y_of_spike = self.top_left_wall_spike.rect.y + self.top_left_wall_spike.get_height()
-        return bird.rect.y - y_of_spike
+        # Run every brain at once and jump where the first output wins
+        actions = self.brains.predict(self.calculate_inputs())
+        population = self.population
+        for index in np.flatnonzero(actions[:, 0] > actions[:, 1]).tolist():
+            bird = population[index]
+            if bird.alive:
+                bird.jump()
 
-    def distance_to_bottom_wall_spike(self, bird):
+    def calculate_inputs(self):
         '''
-        Returns the distance from the given bird to the bottom wall spike.
+        Calculates the distances to the wall and spikes for all birds in the population.
 
-                Parameters:
-                        bird (Bird): Bird to calculate how far from bottom wall spike
                 Returns:
-                        x (int): The distance from the bottom wall spike the bird is
-        '''
-        if bird.x_speed > 0:
-            bird_y = bird.rect.y + bird.get_height()
-            return self.bottom_right_wall_spike.rect.y - bird_y
-        bird_y = bird.rect.y + bird.get_height()
-        return self.bottom_left_wall_spike.rect.y - bird_y
+                        inputs (numpy.array): One row of the five distances per bird
+        '''
+        # Gather the position and direction of every bird, all birds share one size
+        states = np.array([(bird.rect.x, bird.rect.y, bird.x_speed)
+            for bird in self.population], dtype=float)
+        x_pos, y_pos, x_speed = states.T
+        going_right = x_speed > 0
+        bird_width = self.population[0].width
+        bird_bottom = y_pos + self.population[0].height
+
+        # Distance to the wall the bird is going towards, measured from its leading edge
+        right_distance = self.right_side_wall.rect.x - (x_pos + bird_width)
+        left_distance = x_pos - (self.left_side_wall.rect.x + self.left_side_wall.width)
+        wall = np.where(going_right, right_distance, left_distance)
+
+        # Distance to the top and bottom spikes
+        top_spike = y_pos - self.top_spike.height
+        bottom_spike = self.bottom_spike.rect.y - bird_bottom
+
+        # Distance to the wall spikes on the side the bird is going towards
+        top_wall_spike = y_pos - np.where(going_right,
+            self.top_right_wall_spike.rect.y + self.top_right_wall_spike.height,
+            self.top_left_wall_spike.rect.y + self.top_left_wall_spike.height)
+        bottom_wall_spike = np.where(going_right, self.bottom_right_wall_spike.rect.y,
+            self.bottom_left_wall_spike.rect.y) - bird_bottom
+
+        # Match the single precision of the brains
+        return np.column_stack((wall, top_spike, bottom_spike, top_wall_spike,
+            bottom_wall_spike)).astype(np.float32)
 
     def birds_going_same_direction(self):
         '''
@@ -968,24 +1222,32 @@ class Game:
                 Returns:
                         a (bool): If the birds are going in the same direction
         '''
-        speed = self.first_alive_bird().x_speed
-        for bird in self.population:
-            if bird.alive and bird.x_speed != speed:
-                return False
-        return True
+        return self.right_count in (0, self.alive_count)
 
     def collision_detection(self):
         '''
         Checks whether the bird has collided with any other sprite and acts accordingly
         '''
-        for bird in self.population:
-            if bird.collide(self.walls):
+        # Dead birds stay where they died and can't collide again
+        died = False
+        for bird in self.alive_birds:
+            rect = bird.rect
+            if rect.right > self._wall_right_x or rect.left < self._wall_left_x:
                 bird.flip()
+                self.right_count += 1 if bird.x_speed > 0 else -1
                 if self.birds_going_same_direction():
                     self.spike_change()
                     self.score += 1
-            elif bird.collide(self.spikes):
+            elif bird.collide(self._spike_rects):
                 bird.alive = False
+                died = True
+                self.alive_count -= 1
+                if bird.x_speed > 0:
+                    self.right_count -= 1
+
+        # Drop the birds that died so later loops only visit the living ones
+        if died:
+            self.alive_birds = [bird for bird in self.alive_birds if bird.alive]
 
     def update_high_score(self):
         '''
@@ -998,36 +1260,30 @@ class Game:
         '''
         Updates the main components in the game.
         '''
-        self.calculate_action()
-        self.all_sprites_list.update()
+        # Let the birds decide every few steps, in between they just keep on falling
+        if self.steps % self.ACTION_EVERY == 0:
+            self.calculate_action()
+        self.steps += 1
+
+        # Only the living birds move, so update them without the sprite group
+        for bird in self.alive_birds:
+            bird.update()
         self.update_high_score()
 
     def draw(self):
         '''
         Draws the main components for the game.
         '''
-        # Fill the screen with background color
-        self.screen.fill(Game.BACKGROUND)
-
-        # Draw the score
-        score_text = self.font.render(str(self.score), True, Game.WHITE)
-        self.screen.blit(score_text, (self.display_width / 2, self.display_height / 4))
-
-        # Draw generation
-        gen_text = self.font.render("Generation: " + str(self.generation), True, Game.BLACK)
-        self.screen.blit(gen_text, (Game.display_width / 15, Game.display_height / 15))
-
-        # Draw high score
-        high_score_text = self.font.render("Session High Score: "
-            + str(self.high_score), True, Game.BLACK)
-        self.screen.blit(high_score_text, (Game.display_width / 15,
-            (Game.display_height / 15) + 30))
+        # Update the text, which is only formatted and re-rendered when its value changes
+        self.score_text.set_value(self.score)
+        self.generation_text.set_value(self.generation)
+        self.high_score_text.set_value(self.high_score)
 
-        # Draw sprites
-        self.all_sprites_list.draw(self.screen)
+        # Draw the sprites that changed over the background
+        dirty_rects = self.all_sprites_list.draw(self.screen)
 
-        # Update display
-        pygame.display.update()
+        # Update only the changed areas of the display
+        pygame.display.update(dirty_rects)
 
 if __name__ == "__main__":
     Game().play()
@@ -9,47 +9,54 @@ Classes
 ----------
 NeuralNetwork:
     Makes predictions based off of input.
+NeuralNetworkBatch:
+    Makes predictions for many Neural Networks of the same shape at once.
 
 Functions
 ----------
-sigmoid(x_var:float):
-    Activation function to normalize the output information.
-mutate_rate(x_var:float):
-    Tweaks a given value slightly at a 10% chance rate.
+sigmoid_array(x_var:numpy.array, out:numpy.array):
+    Activation function applied to every value of an array at once.
+mutate_array(x_var:numpy.array):
+    Tweaks every value of an array slightly at a 5% chance rate.
 
 """
-import math
-import random
 import numpy as np
 
+# Random number generator for mutations, drawing whole arrays at once
+_rng = np.random.default_rng()
 
-def sigmoid(x_var):
+
+def sigmoid_array(x_var, out=None):
     '''
-    Activation function to normalize the output information.
+    Activation function applied to every value of an array at once.
 
             Parameters:
-                    x_var (float): The number in the sigmoid function
+                    x_var (numpy.array): The numbers in the sigmoid function
+                    out (numpy.array): Array to store the result in, may be x_var itself
             Returns:
-                    a (float): Resulting calculation of the sigmoid function
+                    a (numpy.array): Resulting calculation of the sigmoid function
     '''
-    if x_var < 0:
-        return 1 - 1/(1 + math.exp(x_var))
-    return 1 / (1 + math.exp(-x_var))
+    # Same as 1 / (1 + e^-x) but tanh can't overflow for large inputs
+    out = np.multiply(x_var, 0.5, out=out)
+    np.tanh(out, out=out)
+    out += 1
+    out *= 0.5
+    return out
 
-def mutate_rate(x_var):
+def mutate_array(x_var):
     '''
-    There is a 10% chance the given value is teaked slightly.
+    There is a 5% chance each value is tweaked by a normal offset with a scale of 0.5.
 
         Parameters:
-                x_var (float): Value to tweak or leave the same
+                x_var (numpy.array): Values to tweak or leave the same
         Returns:
-                x (float): Either tweaked value of x_var or the same x_var
+                x (numpy.array): New array of the tweaked and unchanged values
     '''
-    if random.random() < 0.05:
-        offset = random.gauss(0, 1) * 0.5
-        new_x = x_var + offset
-        return new_x
-    return x_var
+    tweaked = _rng.random(x_var.shape, dtype=np.float32) < 0.05
+    offset = _rng.standard_normal(x_var.shape, dtype=np.float32)
+    offset *= 0.5
+    offset *= tweaked
+    return x_var + offset
 
 class NeuralNetwork:
     """
@@ -76,6 +83,9 @@ class NeuralNetwork:
     -------
     predict(input_values:list):
         Given the input values, predict an action.
+    from_arrays(input_hidden_weights:numpy.array, hidden_output_weights:numpy.array,
+            hidden_bias:numpy.array, output_bias:numpy.array):
+        Returns a Neural Network using the given weights and biases.
     copy():
         Returns a Neural Network identical to this one.
     mutate()
@@ -91,13 +101,15 @@ class NeuralNetwork:
         self.hidden_nodes = hidden_nodes
         self.output_nodes = output_nodes
 
-        # Create weights with random values to start with
-        self.input_hidden_weights = np.random.rand(self.hidden_nodes, self.input_nodes)
-        self.hidden_output_weights = np.random.rand(self.output_nodes, self.hidden_nodes)
+        # Create weights with random values to start with, single precision is plenty
+        self.input_hidden_weights = np.random.rand(self.hidden_nodes,
+            self.input_nodes).astype(np.float32)
+        self.hidden_output_weights = np.random.rand(self.output_nodes,
+            self.hidden_nodes).astype(np.float32)
 
         # Create biases
-        self.hidden_bias = np.random.rand(self.hidden_nodes, 1)
-        self.output_bias = np.random.rand(self.output_nodes, 1)
+        self.hidden_bias = np.random.rand(self.hidden_nodes).astype(np.float32)
+        self.output_bias = np.random.rand(self.output_nodes).astype(np.float32)
 
     def save(self):
         '''
@@ -112,10 +124,10 @@ class NeuralNetwork:
         '''
         Load the brain from the files in numpy form.
         '''
-        self.input_hidden_weights = np.loadtxt("Best Brain/ih_weights.txt")
-        self.hidden_output_weights = np.loadtxt("Best Brain/ho_weights.txt")
-        self.output_bias = np.loadtxt("Best Brain/output_bias.txt")
-        self.hidden_bias = np.loadtxt("Best Brain/hidden_bias.txt")
+        self.input_hidden_weights = np.loadtxt("Best Brain/ih_weights.txt", dtype=np.float32)
+        self.hidden_output_weights = np.loadtxt("Best Brain/ho_weights.txt", dtype=np.float32)
+        self.output_bias = np.loadtxt("Best Brain/output_bias.txt", dtype=np.float32)
+        self.hidden_bias = np.loadtxt("Best Brain/hidden_bias.txt", dtype=np.float32)
 
     def predict(self, input_values):
         '''
@@ -124,27 +136,50 @@ class NeuralNetwork:
                 Parameters:
                         input_values (list): The input values to calculate from
                 Returns:
-                        output (list): List of the resulting predictions
+                        output (numpy.array): Array of the resulting predictions
         '''
-        # Vectorize the sigmoid function
-        sigmoid_v = np.vectorize(sigmoid)
-
         # Calculate the hidden layer using inputs
-        inputs = np.asanyarray(input_values)
+        inputs = np.ascontiguousarray(input_values, dtype=self.input_hidden_weights.dtype)
         hidden = np.dot(self.input_hidden_weights, inputs)
 
         # Normalize the hidden data
         hidden = np.add(hidden, self.hidden_bias)
-        hidden = sigmoid_v(hidden)
+        hidden = sigmoid_array(hidden)
 
         # Calculate the output layer using hidden layer
         output = np.dot(self.hidden_output_weights, hidden)
 
-        # Normalize the data and return
+        # Normalize the data and return one prediction per output node
         output = np.add(output, self.output_bias)
-        output = sigmoid_v(output)
+        return sigmoid_array(output)
+
+    @classmethod
+    def from_arrays(cls, input_hidden_weights, hidden_output_weights, hidden_bias,
+            output_bias):
+        '''
+        Returns a Neural Network using the given weights and biases, without creating the
+        random values a new Neural Network starts with.
+
+            Parameters:
+                    input_hidden_weights (numpy.array): The weights from the input nodes
+                    hidden_output_weights (numpy.array): The weights to the output nodes
+                    hidden_bias (numpy.array): The bias for the hidden weights
+                    output_bias (numpy.array): The bias for the output weights
+            Returns:
+                    network (NeuralNetwork): Neural Network using the given arrays
+        '''
+        network = cls.__new__(cls)
+
+        # Take the node counts from the shape of the weights
+        network.hidden_nodes, network.input_nodes = input_hidden_weights.shape
+        network.output_nodes = hidden_output_weights.shape[0]
 
-        return output.tolist()
+        # Use the given arrays as they are, without copying them
+        network.input_hidden_weights = input_hidden_weights
+        network.hidden_output_weights = hidden_output_weights
+        network.hidden_bias = hidden_bias
+        network.output_bias = output_bias
+        return network
 
     def copy(self):
         '''
@@ -153,16 +188,10 @@ class NeuralNetwork:
             Returns:
                     copy_of_self (NeuralNetwork): Copy of all of its data
         '''
-        # Copy values of nodes
-        copy_of_self = NeuralNetwork(self.input_nodes, self.hidden_nodes, self.output_nodes)
-
-        # Copy value of weights
-        copy_of_self.input_hidden_weights = self.input_hidden_weights
-        copy_of_self.hidden_output_weights = self.hidden_output_weights
-
-        # Copy value of biases
-        copy_of_self.hidden_bias = self.hidden_bias
-        copy_of_self.output_bias = self.output_bias
+        # Copy the weights and biases into arrays of its own
+        copy_of_self = NeuralNetwork.from_arrays(self.input_hidden_weights.copy(),
+            self.hidden_output_weights.copy(), self.hidden_bias.copy(),
+            self.output_bias.copy())
 
         # Return copy
         return copy_of_self
@@ -171,11 +200,122 @@ class NeuralNetwork:
         '''
         Mutates all the values of the Neural Network such as weights and biases.
         '''
-        # Vectorize the mutation rate
-        mutate_rate_v = np.vectorize(mutate_rate)
-
         # Adjust all weights and biases slightly
-        self.input_hidden_weights = mutate_rate_v(self.input_hidden_weights)
-        self.hidden_output_weights = mutate_rate_v(self.hidden_output_weights)
-        self.hidden_bias = mutate_rate_v(self.hidden_bias)
-        self.output_bias = mutate_rate_v(self.output_bias)
+        self.input_hidden_weights = mutate_array(self.input_hidden_weights)
+        self.hidden_output_weights = mutate_array(self.hidden_output_weights)
+        self.hidden_bias = mutate_array(self.hidden_bias)
+        self.output_bias = mutate_array(self.output_bias)
+
+class NeuralNetworkBatch:
+    """
+    A class to evaluate the brains of a whole population at once.
+
+    Attributes
+    ----------
+    input_hidden_weights : numpy.array
+        the weights between the input nodes and the hidden nodes of every network
+    hidden_output_weights : numpy.array
+        the weights between the hidden nodes and the output nodes of every network
+    hidden_bias : numpy.array
+        the bias for the hidden weights of every network
+    output_bias : numpy.array
+        the bias for the output weights of every network
+    hidden_values : numpy.array
+        the hidden layer of every network, reused by every prediction
+    output_values : numpy.array
+        the output layer of every network, reused by every prediction
+
+    Methods
+    -------
+    predict(input_values:numpy.array):
+        Given one row of input values per network, predict an action for each.
+    select(indexes:list):
+        Returns a new batch holding copies of the networks at the given indexes.
+    mutate(networks:slice):
+        Mutates the weights and biases of the given networks all at once.
+    networks():
+        Returns a Neural Network for every network sharing the batch's values.
+    create_layers():
+        Creates the arrays every prediction stores its layers in.
+    """
+    def __init__(self, networks):
+        # Stack the weights of every network along the first axis
+        self.input_hidden_weights = np.stack([network.input_hidden_weights
+            for network in networks])
+        self.hidden_output_weights = np.stack([network.hidden_output_weights
+            for network in networks])
+
+        # Stack the biases as rows
+        self.hidden_bias = np.stack([network.hidden_bias for network in networks])
+        self.output_bias = np.stack([network.output_bias for network in networks])
+        self.create_layers()
+
+    def create_layers(self):
+        '''
+        Creates the arrays every prediction stores its hidden and output layers in.
+        '''
+        self.hidden_values = np.empty(self.hidden_bias.shape, self.hidden_bias.dtype)
+        self.output_values = np.empty(self.output_bias.shape, self.output_bias.dtype)
+
+    def predict(self, input_values):
+        '''
+        Predicts an action for every network based on its row of input values.
+
+                Parameters:
+                        input_values (numpy.array): One row of input values per network
+                Returns:
+                        output (numpy.array): One row of resulting predictions per network,
+                        overwritten by the next prediction
+        '''
+        # Calculate the hidden layer of every network using its inputs
+        hidden = np.einsum('nhi,ni->nh', self.input_hidden_weights, input_values,
+            out=self.hidden_values)
+        hidden += self.hidden_bias
+        sigmoid_array(hidden, out=hidden)
+
+        # Calculate the output layer of every network using its hidden layer
+        output = np.einsum('noh,nh->no', self.hidden_output_weights, hidden,
+            out=self.output_values)
+        output += self.output_bias
+        return sigmoid_array(output, out=output)
+
+    def select(self, indexes):
+        '''
+        Returns a new batch holding copies of the networks at the given indexes.
+
+                Parameters:
+                        indexes (list): Index of the network to copy for every new network
+                Returns:
+                        selected (NeuralNetworkBatch): Batch of the copied networks
+        '''
+        # Indexing with a list copies the selected rows of every array
+        selected = NeuralNetworkBatch.__new__(NeuralNetworkBatch)
+        selected.input_hidden_weights = self.input_hidden_weights[indexes]
+        selected.hidden_output_weights = self.hidden_output_weights[indexes]
+        selected.hidden_bias = self.hidden_bias[indexes]
+        selected.output_bias = self.output_bias[indexes]
+        selected.create_layers()
+        return selected
+
+    def mutate(self, networks=slice(None)):
+        '''
+        Mutates the weights and biases of the given networks all at once.
+
+                Parameters:
+                        networks (slice): Networks of the batch to mutate
+        '''
+        for values in (self.input_hidden_weights, self.hidden_output_weights,
+                self.hidden_bias, self.output_bias):
+            # Write the tweaked values back into the batch's own arrays
+            values[networks] = mutate_array(values[networks])
+
+    def networks(self):
+        '''
+        Returns a Neural Network for every network sharing the batch's values.
+
+                Returns:
+                        networks (list): One Neural Network per network in the batch
+        '''
+        # Point every network to the batch's rows
+        return [NeuralNetwork.from_arrays(*arrays) for arrays in zip(self.input_hidden_weights,
+            self.hidden_output_weights, self.hidden_bias, self.output_bias)]